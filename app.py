@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import fastjsonschema
 import yaml
-from functools import reduce
-from jsonschema import validate
-from typing import Any
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from pathlib import Path
+from typing import Any, Callable
+
+# Use the libyaml based loader when it is available since it is much faster
+# than the pure python loader.
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+# Sort key for ordering employees alphabetically by their first name.
+byFirstName = attrgetter('first_name')
+
+# Gets the fields of an employee dict in the order Employee.fromRow takes them.
+employeeFields = itemgetter('id', 'first_name', 'salary', 'manager')
 
 class Employee:
     """
@@ -24,6 +39,8 @@ class Employee:
 
     Methods
     -------
+    fromRow(id: int, first_name: str, salary: int, manager: int): Employee
+        Creates an employee from the values of its fields.
     isOwner(): bool
         Checks the status of the employee to see whether they are an Owner/top
         level employee.
@@ -35,6 +52,8 @@ class Employee:
         Sets the list of employees that this employee manages.
     """
 
+    __slots__ = ('id', 'first_name', 'salary', 'manager', 'employees')
+
     def __init__(self, employee: dict[str, Any]):
         """
         Parameters
@@ -49,6 +68,37 @@ class Employee:
         self.manager: int = employee['manager']
         self.employees: list[Employee] = []
 
+    @classmethod
+    def fromRow(cls, id: int, first_name: str, salary: int, manager: int) -> Employee:
+        """
+        Creates an employee from the values of its fields.
+
+        Parameters
+        ----------
+        id: int
+            An id for the employee.
+        first_name: str
+            The first name of the employee.
+        salary: int
+            The salary of the employee.
+        manager: int
+            The id of the employee's manager.
+
+        Returns
+        -------
+        Employee
+            The employee with the given fields.
+        """
+
+        # Skip __init__ so the fields don't need to be put in a dict first.
+        employee = cls.__new__(cls)
+        employee.id = id
+        employee.first_name = first_name
+        employee.salary = salary
+        employee.manager = manager
+        employee.employees = []
+        return employee
+
     def isOwner(self) -> bool:
         """
         Checks the status of the employee to see whether they are an Owner/top
@@ -63,7 +113,7 @@ class Employee:
 
         # If the employee does not have a manager they are the owner/top level
         # employee
-        return self.manager == None
+        return self.manager is None
 
     def isManager(self) -> bool:
         """
@@ -99,17 +149,16 @@ class Employee:
 
     def setEmployees(self, employees: list[Employee]):
         """
-        Sets the list of employees that this employee manages in alphabetical
-        order.
+        Sets the list of employees that this employee manages. The employees
+        are kept in the order given, callers that want them in alphabetical
+        order should sort them first.
 
         Parameters
         ----------
         employees: list[Employee]
             A list of employees that this employee manages.
         """
-        
-        # sort the employees by first name
-        employees.sort(key = lambda x: x.first_name)
+
         self.employees = employees
 
 class Staff:
@@ -136,16 +185,39 @@ class Staff:
         ----------
         employees: list[Employee]
             A list of the employees on staff.
+
+        Raises
+        ------
+        ValueError
+            An error indicating an employee ends up managing themselves through
+            the chain of managers, which happens when employee ids are reused.
         """
 
         # sort the employees by first name
-        employees.sort(key = lambda x: x.first_name)
+        employees.sort(key = byFirstName)
 
         self.employees = employees
+
+        # Index the employees by the id of their manager. Since the employees
+        # are already sorted by first name each list of employees is sorted as
+        # well. The total salary of the staff is added up in the same pass.
+        self.__children: dict[int, list[Employee]] = {}
+        self.__totalSalary = 0
+        for employee in self.employees:
+            self.__children.setdefault(employee.manager, []).append(employee)
+            self.__totalSalary += employee.salary
         
         # Get the top owners/top level employees for generating the staff
-        # hierarchy
-        self.hierarchy = [x for x in self.employees if x.isOwner()];
+        # hierarchy. Owners don't have a manager so they are indexed under None.
+        self.hierarchy: list[Employee] = self.__children.get(None, [])
+
+        # The employees in the hierarchy paired with their depth, in the order
+        # they are displayed.
+        self.__hierarchyOrder: list[tuple[int, Employee]] = []
+
+        # The string representation of the hierarchy, generated the first time
+        # it is needed.
+        self.__hierarchyString: str | None = None
 
         # Set all of the levels of the hierarchy
         self.__generateHierarchy(self.hierarchy)
@@ -153,37 +225,66 @@ class Staff:
     def __generateHierarchy(self, hierarchyLevel: list[Employee]):
         """
         Generates the staff hierarchy based off of a starting list of top level
-        employees.
+        employees and records the order the employees are displayed in.
 
         Parameters
         ----------
         hierarchyLevel: list[Employee]
             The top level of employees to generate a hierarchy for.
+
+        Raises
+        ------
+        ValueError
+            An error indicating an employee manages themselves through the
+            chain of managers.
         """
-        for employee in hierarchyLevel:
-            # Get all employees managed by this employee
-            employees = [x for x in self.employees if x.reportsToId(employee.id)]
 
-            if len(employees) > 0:
-                # If we found employees set the employees under the current
-                # employee
-                employee.setEmployees(employees)
+        # A stack of employees left to visit paired with their depth in the
+        # hierarchy. Employees are pushed in reverse so they are visited in
+        # alphabetical order.
+        stack = [(0, employee) for employee in reversed(hierarchyLevel)]
+
+        # The managers of the current employee from the top level down, and the
+        # object ids of those managers for checking for cycles.
+        managers: list[Employee] = []
+        managerIds: set[int] = set()
+
+        while stack:
+            depth, employee = stack.pop()
 
-                # recurse through the next level of employees
-                self.__generateHierarchy(employee.employees)
+            # Drop the managers that are not above the current employee.
+            while len(managers) > depth:
+                managerIds.discard(id(managers.pop()))
 
+            # If the employee is one of their own managers the hierarchy would
+            # never end.
+            if id(employee) in managerIds:
+                raise ValueError(f"Employee {employee.id} ({employee.first_name}) manages themselves through their managers")
 
+            managers.append(employee)
+            managerIds.add(id(employee))
 
-    def __generateHierarchyString(self, hierarchyLevel: list[Employee], depth: int = 0, tabWidth: int = 2) -> str:
+            # Record the employee's position in the hierarchy.
+            self.__hierarchyOrder.append((depth, employee))
+
+            # Get all employees managed by this employee
+            employees = self.__children.get(employee.id)
+
+            if employees:
+                # If we found employees set the employees under the current
+                # employee. They are already in alphabetical order.
+                employee.employees = employees
+
+                # visit the next level of employees before the rest of the
+                # current level
+                stack.extend((depth + 1, x) for x in reversed(employees))
+
+    def __generateHierarchyString(self, tabWidth: int = 2) -> str:
         """
         Creates a string representation of the staff hierarchy.
 
         Parameters
         ----------
-        hierarchyLevel: list[Employee]
-            The current position in the hierarchy to generate a string for.
-        depth: int
-            The current depth in the hierarchy, defaults to 0.
         tabWidth: int
             How much to indent each level in the hierarchy, defaults to 2.
 
@@ -193,24 +294,26 @@ class Staff:
             The string representation of the hierarchy of staff.
         """
 
-        # The string representing the hierarchy form the current level.
-        hierarchyString = ''
+        # The pieces of the string representing the hierarchy.
+        hierarchyParts: list[str] = []
 
-        # The indentation of the current level in the hierarchy.
-        prefix = ' ' * depth
+        # The indentation for each depth in the hierarchy. An employee is at
+        # most one level deeper than the employee before them so the list only
+        # ever needs to grow by one.
+        indents: list[str] = []
 
-        for employee in hierarchyLevel:
-            # Add each employee in the level to the hierarchyString.
-            hierarchyString += prefix + employee.first_name + '\n'
+        for depth, employee in self.__hierarchyOrder:
+            if depth == len(indents):
+                indents.append(' ' * (depth * tabWidth))
 
-            if employee.isManager():
-                # add the employees under the current employee to the
-                # hierarchyString by recursing through them.
-                hierarchyString += self.__generateHierarchyString(employee.employees, depth + tabWidth, tabWidth)
+            # Add each employee to the hierarchyParts indented by their depth
+            # in the hierarchy.
+            hierarchyParts.append(indents[depth])
+            hierarchyParts.append(employee.first_name)
+            hierarchyParts.append('\n')
 
-
-        # return the hierarchyString generated from the current hierarchyLevel.
-        return hierarchyString
+        # join the hierarchyParts into a single string and return it.
+        return ''.join(hierarchyParts)
 
 
     def __repr__(self):
@@ -223,7 +326,12 @@ class Staff:
             The string representation of the staff.
         """
 
-        return self.__generateHierarchyString(self.hierarchy)
+        # The hierarchy doesn't change after the staff is created so the string
+        # only needs to be generated once.
+        if self.__hierarchyString is None:
+            self.__hierarchyString = self.__generateHierarchyString()
+
+        return self.__hierarchyString
 
     def totalSalary(self) -> int:
         """
@@ -235,17 +343,32 @@ class Staff:
             The total of the staff members' salaries.
         """
 
-        # Get the salaries from all of the employees.
-        salaries = map(lambda x: x.salary, self.employees)
-
-        # Add the salaries together and return them.
-        return reduce(lambda a, b: a + b, salaries)
+        # The salaries are added together when the staff is created.
+        return self.__totalSalary
         
 
 
-def readEmployeeData():
+def readEmployeeFile() -> bytes:
+    """
+    Reads the contents of employees.yml.
+
+    Returns
+    -------
+    bytes
+        The contents of the employee data yaml file.
+    """
+
+    # Read the whole file at once so it is closed before it is parsed.
+    return Path('employees.yml').read_bytes()
+
+def parseEmployeeData(employees: bytes) -> list[dict[str, Any]]:
     """
-    Reads employee data from employees.yml.
+    Parses the contents of an employee data yaml file.
+
+    Parameters
+    ----------
+    employees: bytes
+        The contents of an employee data yaml file.
 
     Returns
     -------
@@ -253,14 +376,14 @@ def readEmployeeData():
         The employees as a list of dicts.
     """
 
-    fEmployees = open('employees.yml')
-    
-    # Convert the yaml file to a list of dicts and return it.
-    return yaml.safe_load(fEmployees);
+    # Convert the yaml to a list of dicts and return it.
+    return yaml.load(employees, Loader = YamlLoader)
 
+@lru_cache(maxsize=1)
 def readEmployeeSchema():
     """
-    Reads the employee json schema from employees-schema.yml.
+    Reads the employee json schema from employees-schema.yml. The file is only
+    read the first time this is called, later calls return the same dict.
 
     Returns
     -------
@@ -268,10 +391,25 @@ def readEmployeeSchema():
         The json schema representing the employee data as a dict.
     """
 
-    fSchema = open('employees-schema.yml')
+    # Read the whole file at once so it is closed before it is parsed.
+    schema = Path('employees-schema.yml').read_bytes()
 
     # convert the yaml file into a dict and return it.
-    return yaml.safe_load(fSchema)
+    return yaml.load(schema, Loader = YamlLoader)
+
+@lru_cache(maxsize=1)
+def compileEmployeeSchema() -> Callable[[Any], Any]:
+    """
+    Compiles the employee json schema into a validation function. The schema
+    is only compiled the first time this is called.
+
+    Returns
+    -------
+    Callable[[Any], Any]
+        A function that validates employee data against the json schema.
+    """
+
+    return fastjsonschema.compile(readEmployeeSchema())
 
 def validateEmployeeData(data: list[dict[str, Any]]) -> list[Employee]:
     """
@@ -285,7 +423,7 @@ def validateEmployeeData(data: list[dict[str, Any]]) -> list[Employee]:
 
     Raises
     ------
-    ValidationError
+    fastjsonschema.JsonSchemaValueException
         An error indicating the employee data did not meet the json schema's
         requirements.
 
@@ -295,15 +433,51 @@ def validateEmployeeData(data: list[dict[str, Any]]) -> list[Employee]:
         The employees wrapped in the Employee class.
     """
 
-    # load the json schema
-    schema = readEmployeeSchema()
+    # load the compiled json schema
+    validate = compileEmployeeSchema()
+
+    # validate the employee data against the employee json schema, then wrap
+    # the validated employees in the Employee class and return them.
+    return [Employee.fromRow(*employeeFields(x)) for x in validate(data)]
+
+
+@lru_cache(maxsize=8)
+def loadStaff(employees: bytes) -> Staff:
+    """
+    Creates the staff from the contents of an employee data yaml file. The
+    staff for the most recently used files are cached so loading the same data
+    again returns the same Staff instance.
+
+    The cached Staff is shared between callers, including its employees and
+    hierarchy lists and the Employee objects in them. Changing any of them
+    changes the staff returned by every later call with the same data.
 
-    # validate the employee data against the employee json schema
-    validate(data, schema)
+    Parameters
+    ----------
+    employees: bytes
+        The contents of an employee data yaml file.
 
-    # Wrap the employees in the Employee class and return them.
-    return [Employee(x) for x in data ]
+    Raises
+    ------
+    fastjsonschema.JsonSchemaValueException
+        An error indicating the employee data did not meet the json schema's
+        requirements.
+    ValueError
+        An error indicating an employee manages themselves through the chain
+        of managers.
 
+    Returns
+    -------
+    Staff
+        The staff representing the validated employee data.
+    """
+
+    # Convert the yaml to a list of dicts and validate it.
+    validatedEmployees = validateEmployeeData(parseEmployeeData(employees))
+
+    # Create a new instance of the Staff class representing the validated
+    # employee data
+    return Staff(validatedEmployees)
 
 def main():
     """
@@ -311,13 +485,8 @@ def main():
     total salary of the staff members.
     """
 
-    # Read and validate the employee data
-    employees = readEmployeeData()
-    validatedEmployees = validateEmployeeData(employees)
-
-    # Create a new instance of the Staff class representing the validated
-    # employee data
-    staff = Staff(validatedEmployees)
+    # Read the employee data and create the staff from it
+    staff = loadStaff(readEmployeeFile())
 
     # Print the staff hierarchy
     print(staff)
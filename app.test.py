@@ -1,3 +1,4 @@
+import sys
 import unittest
 import unittest.mock
 from unittest.mock import patch
@@ -21,6 +22,21 @@ class TestEmployee(unittest.TestCase):
         manager.setEmployees([employee])
         self.assertIn(employee, manager.employees, "Should contain the employee")
 
+    def test_employee_setEmployees_keepsOrder(self):
+        manager = app.Employee.fromRow(1, 'jacob', 130000, None)
+        employee = app.Employee.fromRow(2, 'zoe', 130000, 1)
+        employee2 = app.Employee.fromRow(3, 'brian', 130000, 1)
+        manager.setEmployees([employee, employee2])
+        self.assertEqual(manager.employees, [employee, employee2], "Should keep the given order")
+
+    def test_employee_fromRow(self):
+        employee = app.Employee.fromRow(1, 'jacob', 130000, 2)
+        self.assertEqual(employee.id, 1, "Should have the id")
+        self.assertEqual(employee.first_name, 'jacob', "Should have the first name")
+        self.assertEqual(employee.salary, 130000, "Should have the salary")
+        self.assertEqual(employee.manager, 2, "Should have the manager")
+        self.assertEqual(employee.employees, [], "Should not have employees")
+
     def test_employee_isOwner(self):
         employee = app.Employee({
                 'id': 1,
@@ -105,6 +121,21 @@ class TestStaff(unittest.TestCase):
         self.assertIn(employee2, staff.hierarchy[0].employees, "Second level of hierarchy should contain employee2")
         self.assertEqual(employee3, staff.hierarchy[0].employees[0], "employees of a staff member should be sorted alphabetically")
 
+    def test_staff_hierarchy_cycle(self):
+        employee = app.Employee.fromRow(1, 'jacob', 130000, None)
+        employee2 = app.Employee.fromRow(2, 'brian', 130000, 1)
+        employee3 = app.Employee.fromRow(1, 'a', 130000, 2)
+        with self.assertRaises(ValueError):
+            app.Staff([employee, employee2, employee3])
+
+    def test_staff_hierarchy_deep(self):
+        depth = sys.getrecursionlimit() + 100
+        employees = [app.Employee.fromRow(i, 'jacob', 1, i - 1 if i else None) for i in range(depth)]
+        staff = app.Staff(employees)
+        lastLine = str(staff).splitlines()[-1]
+        self.assertEqual(lastLine, ' ' * ((depth - 1) * 2) + 'jacob', "Deepest employee should be indented by their depth")
+        self.assertEqual(staff.totalSalary(), depth, "Should be the number of employees")
+
     def test_staff_string(self):
         employee = app.Employee({
                 'id': 1,
@@ -128,6 +159,32 @@ class TestStaff(unittest.TestCase):
         expectedString = "jacob\n  a\n  jacob\n"
         self.assertEqual(str(staff),expectedString)
 
+class TestValidateEmployeeData(unittest.TestCase):
+    def test_validateEmployeeData(self):
+        employees = app.validateEmployeeData([
+            {'id': 1, 'first_name': 'jacob', 'manager': None, 'salary': 130000}
+        ])
+        self.assertEqual(employees[0].first_name, 'jacob', "Should wrap the employee")
+
+    def test_validateEmployeeData_invalid(self):
+        with self.assertRaises(app.fastjsonschema.JsonSchemaValueException):
+            app.validateEmployeeData({'id': 1})
+        with self.assertRaises(app.fastjsonschema.JsonSchemaValueException):
+            app.validateEmployeeData([
+                {'id': '1', 'first_name': 'jacob', 'manager': None, 'salary': 130000}
+            ])
+
+class TestLoadStaff(unittest.TestCase):
+    def test_loadStaff(self):
+        employees = b"""[
+            {'first_name': 'jacob', 'id': 1, 'manager': null, 'salary': 130000},
+            {'first_name': 'a', 'id': 2, 'manager': 1, 'salary': 130000}
+        ]"""
+        staff = app.loadStaff(employees)
+        self.assertEqual(str(staff), "jacob\n  a\n")
+        self.assertEqual(staff.totalSalary(), 260000, "Should be 260000")
+        self.assertIs(app.loadStaff(employees), staff, "Should reuse the cached staff")
+
 
 if __name__ == '__main__':
     unittest.main()